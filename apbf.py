@@ -0,0 +1,142 @@
+"""
+Age-Partitioned Bloom Filter (Shtul, Baquero, Almeida, 2020)
+Pure standard library - no platform or third-party dependencies
+
+Cost: an insert sets k bits and a query probes up to k+l slices. k
+grows with log2(1/fpr), so relaxing fpr only shrinks it slowly (the
+defaults give k=26, l=64; fpr=1e-3 still needs k=16).
+"""
+import math
+from hashlib import blake2b
+from typing import List, Tuple
+
+_MASK64 = (1 << 64) - 1
+
+
+class APBF:
+    """
+    Sliding-window Bloom filter for deduplicating an unbounded event stream.
+
+    The filter keeps k+l equally sized slices. Each key is inserted into
+    the k newest slices; after every `generation` insertions the oldest
+    slice is retired and a fresh one takes the newest position. A key is
+    reported present when k consecutive slices all contain it, so the
+    last `n` keys are always remembered and the false-positive rate stays
+    bounded by `fpr` without ever clearing the whole filter.
+    """
+
+    def __init__(self, n: int = 50_000, fpr: float = 1e-6):
+        if n <= 0:
+            raise ValueError(f"n must be positive, got: {n}")
+        if not 0.0 < fpr < 1.0:
+            raise ValueError(f"fpr must be in (0, 1), got: {fpr}")
+
+        self.n = n
+        self.fpr = fpr
+        self.k, self.l = self._parameters(n, fpr)
+        self.generation = math.ceil(n / self.l)
+        # Each slice absorbs k generations; size it for a ~50% fill ratio
+        self.slice_bits = math.ceil(self.k * self.generation / math.log(2))
+
+        self._slices: List[bytearray] = [
+            bytearray((self.slice_bits + 7) // 8) for _ in range(self.k + self.l)
+        ]
+        self._empty = bytes(len(self._slices[0]))
+        self._base = 0  # physical index of the newest slice
+        self._count = 0  # insertions into the current generation
+
+    @staticmethod
+    def _parameters(n: int, fpr: float) -> Tuple[int, int]:
+        """Pick (k, l) meeting fpr with the fewest total bits"""
+        best = None
+        # Memory gains flatten out quickly while query cost grows with k+l
+        for l in range(1, 65):
+            # Union bound over the l+1 windows of k consecutive half-full slices
+            k = math.ceil(math.log2((l + 1) / fpr))
+            bits = (k + l) * math.ceil(k * math.ceil(n / l) / math.log(2))
+            if best is None or bits < best[0]:
+                best = (bits, k, l)
+        return best[1], best[2]
+
+    @property
+    def size_in_bytes(self) -> int:
+        """Memory held by the slice bit arrays"""
+        return sum(len(s) for s in self._slices)
+
+    def _hash(self, key: bytes) -> Tuple[int, int]:
+        digest = blake2b(key, digest_size=16).digest()
+        return (
+            int.from_bytes(digest[:8], "little"),
+            int.from_bytes(digest[8:], "little") | 1,
+        )
+
+    def _hash_int(self, key: int) -> Tuple[int, int]:
+        # splitmix64 finalizer; its 32-bit rotation serves as the second hash
+        x = key & _MASK64
+        x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+        x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+        x ^= x >> 31
+        return x, ((x >> 32) | (x << 32) & _MASK64) | 1
+
+    def _contains(self, h1: int, h2: int) -> bool:
+        # Scan from the oldest window; on a miss jump back k slices and
+        # reuse the hits already seen after it (paper, Algorithm 2)
+        slices, m, k = self._slices, self.slice_bits, self.k
+        total = len(slices)
+        i = self.l
+        prev_count = count = 0
+        while i >= 0:
+            p = (self._base + i) % total
+            pos = ((h1 + p * h2) & _MASK64) % m
+            if slices[p][pos >> 3] & (1 << (pos & 7)):
+                count += 1
+                if prev_count + count == k:
+                    return True
+                i += 1
+            else:
+                i -= k
+                prev_count = count
+                count = 0
+        return False
+
+    def _add(self, h1: int, h2: int) -> None:
+        if self._count >= self.generation:
+            self._shift()
+
+        slices, m = self._slices, self.slice_bits
+        total = len(slices)
+        for age in range(self.k):
+            p = (self._base + age) % total
+            pos = ((h1 + p * h2) & _MASK64) % m
+            slices[p][pos >> 3] |= 1 << (pos & 7)
+        self._count += 1
+
+    def _shift(self) -> None:
+        """Retire the oldest slice and reuse it as the newest one"""
+        self._base = (self._base - 1) % len(self._slices)
+        self._slices[self._base][:] = self._empty
+        self._count = 0
+
+    def add(self, key: bytes) -> None:
+        """Insert key"""
+        self._add(*self._hash(key))
+
+    def contains(self, key: bytes) -> bool:
+        """Check if key was (probably) inserted within the window"""
+        return self._contains(*self._hash(key))
+
+    def contains_and_add(self, key: bytes) -> bool:
+        """Insert key, returning True if it was not already present"""
+        h1, h2 = self._hash(key)
+        if self._contains(h1, h2):
+            return False
+        self._add(h1, h2)
+        return True
+
+    def contains_and_add_int(self, key: int) -> bool:
+        """Like contains_and_add, for keys that are already integers"""
+        h1, h2 = self._hash_int(key)
+        if self._contains(h1, h2):
+            return False
+        self._add(h1, h2)
+        return True
@@ -3,36 +3,167 @@ Application logic - Completely independent of blivedm or any specific platform
 This code works with ANY adapter (Bilibili, Twitch, YouTube, etc.)
 """
 import asyncio
-import time
+import atexit
 import logging
+import queue
+from array import array
 from dataclasses import dataclass, field
-from typing import Dict, Set
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional
 
+from apbf import APBF
 from livestream_interface import LiveStreamAdapter, LiveStreamEventHandler
 from domain_models import ChatMessage, GiftEvent, SuperChatEvent, GuardPurchaseEvent
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+
+def _setup_logging() -> None:
+    """
+    Log through a QueueHandler so stderr writes happen on a listener
+    thread instead of blocking the event loop
+    """
+    root = logging.getLogger()
+    if root.handlers:
+        return
+    
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(
+        logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    )
+    log_queue: queue.Queue = queue.Queue(-1)
+    listener = QueueListener(log_queue, stream_handler)
+    
+    root.setLevel(logging.INFO)
+    root.addHandler(QueueHandler(log_queue))
+    listener.start()
+    atexit.register(listener.stop)
+
+
+_setup_logging()
 logger = logging.getLogger(__name__)
 
+# Events the dedup filter is guaranteed to remember, and its false-positive rate
+DEDUP_CAPACITY = 50_000
+DEDUP_FPR = 1e-6
+
+# Event type tags for packed dedup keys
+_TAG_GIFT = 1
+_TAG_SC = 2
+_TAG_GUARD = 3
+
+
+def _pack_event_key(tag: int, uid: int, ts_ms: int, disc: int) -> bytes:
+    """
+    Pack an event identity into a fixed 16-byte dedup key.
+
+    Layout (little-endian uint128): tag:8 | uid:56 | ts_ms:48 | disc:16
+    """
+    key = (
+        (tag << 120)
+        | ((uid & 0xFFFFFFFFFFFFFF) << 64)
+        | ((ts_ms & 0xFFFFFFFFFFFF) << 16)
+        | (disc & 0xFFFF)
+    )
+    return key.to_bytes(16, "little")
+
 
 # ---------- Application State (Platform-independent) ----------
-@dataclass
+@dataclass(slots=True)
 class UserStats:
-    """Statistics for a single user"""
+    """Statistics for a single user (snapshot of one UserStatsTable row)"""
     gift_count_today: int = 0
     gift_value_today: float = 0.0
     chat_count_today: int = 0
     last_seen_ts: float = 0.0
 
 
-@dataclass
+class _UserIndex(dict):
+    """user_id -> row index, appending a zeroed row on first access"""
+    __slots__ = ('_table',)
+
+    def __init__(self, table: 'UserStatsTable'):
+        super().__init__()
+        self._table = table
+
+    def __missing__(self, user_id: int) -> int:
+        # Append first so a rejected user_id leaves index and columns in step
+        row = len(self)
+        self._table._append_row(user_id)
+        self[user_id] = row
+        return row
+
+
+class UserStatsTable:
+    """
+    Per-user statistics stored column-wise (struct of arrays).
+
+    Each column is a typed array indexed by the user's row, so summaries
+    run over packed machine values instead of per-user objects.
+    """
+    __slots__ = ('ids', 'user_id', 'gift_count', 'gift_value', 'chat_count', 'last_seen')
+
+    def __init__(self):
+        self.ids = _UserIndex(self)
+        self.user_id = array('q')  # row -> user_id
+        self.gift_count = array('q')
+        self.gift_value = array('d')
+        self.chat_count = array('q')
+        self.last_seen = array('d')
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self.ids
+
+    def _append_row(self, user_id: int) -> None:
+        self.user_id.append(user_id)
+        self.gift_count.append(0)
+        self.gift_value.append(0.0)
+        self.chat_count.append(0)
+        self.last_seen.append(0.0)
+
+    def touch(self, user_id: int, ts: float) -> int:
+        """Record that a user was seen at ts, returning their row"""
+        row = self.ids[user_id]
+        # Event kinds carry timestamps of different precision; never go back
+        if ts > self.last_seen[row]:
+            self.last_seen[row] = ts
+        return row
+
+    def record_gift(self, user_id: int, quantity: int, value_cny: float, ts: float) -> int:
+        """Count a gift and mark the user seen, returning their row"""
+        row = self.ids[user_id]
+        self.gift_count[row] += quantity
+        self.gift_value[row] += value_cny
+        if ts > self.last_seen[row]:
+            self.last_seen[row] = ts
+        return row
+
+    def most_recent_user(self) -> Optional[int]:
+        """user_id with the latest last-seen time, or None if empty"""
+        if not self.ids:
+            return None
+        last_seen = self.last_seen
+        return self.user_id[last_seen.index(max(last_seen))]
+
+    def get(self, user_id: int) -> Optional[UserStats]:
+        """Copy a user's row into a UserStats, or None if never seen"""
+        row = self.ids.get(user_id)
+        if row is None:
+            return None
+        return UserStats(
+            gift_count_today=self.gift_count[row],
+            gift_value_today=self.gift_value[row],
+            chat_count_today=self.chat_count[row],
+            last_seen_ts=self.last_seen[row],
+        )
+
+
+@dataclass(slots=True)
 class BotState:
     """Global application state"""
-    processed_event_ids: Set[str] = field(default_factory=set)
-    user_stats: Dict[int, UserStats] = field(default_factory=dict)
+    dedup: APBF = field(default_factory=lambda: APBF(n=DEDUP_CAPACITY, fpr=DEDUP_FPR))
+    user_stats: UserStatsTable = field(default_factory=UserStatsTable)
 
 
 # ---------- Application Logic ----------
@@ -44,29 +175,23 @@ class LiveStreamBot(LiveStreamEventHandler):
     It only works with domain models (ChatMessage, GiftEvent, etc.)
     """
     
-    def __init__(self):
-        self.state = BotState()
+    def __init__(self, dedup_capacity_hint: int = DEDUP_CAPACITY):
+        """
+        Initialize the bot
+        
+        Args:
+            dedup_capacity_hint: Number of recent events the dedup filter
+                must remember; its memory is allocated up front for this
+        """
+        self.state = BotState(dedup=APBF(n=dedup_capacity_hint, fpr=DEDUP_FPR))
     
-    def _dedup(self, event_id: str) -> bool:
+    def _dedup(self, event_key: bytes) -> bool:
         """Check if event is duplicate"""
-        if not event_id:
-            return True
-        if event_id in self.state.processed_event_ids:
-            return False
-        self.state.processed_event_ids.add(event_id)
-        
-        # Prevent unbounded growth
-        if len(self.state.processed_event_ids) > 200000:
-            logger.warning("Clearing event dedup cache (reached 200k)")
-            self.state.processed_event_ids.clear()
-        
-        return True
+        return self.state.dedup.contains_and_add(event_key)
     
-    def _get_user_stats(self, user_id: int) -> UserStats:
-        """Get or create user stats"""
-        if user_id not in self.state.user_stats:
-            self.state.user_stats[user_id] = UserStats()
-        return self.state.user_stats[user_id]
+    def _dedup_int(self, event_key: int) -> bool:
+        """Check if event is duplicate, for integer keys"""
+        return self.state.dedup.contains_and_add_int(event_key)
     
     # ========== Event Handlers ==========
     # These receive domain events, NOT platform-specific data
@@ -74,55 +199,99 @@ class LiveStreamBot(LiveStreamEventHandler):
     def on_chat_message(self, message: ChatMessage) -> None:
         """Handle chat message"""
         try:
-            stats = self._get_user_stats(message.user_id)
-            stats.chat_count_today += 1
-            stats.last_seen_ts = time.time()
+            table = self.state.user_stats
+            idx = table.touch(message.user_id, message.timestamp)
+            table.chat_count[idx] += 1
             
             logger.info(
-                f"[CHAT] {message.username}({message.user_id}): {message.content}"
+                "[CHAT] %s(%d): %s", message.username, message.user_id, message.content
             )
         except Exception as e:
             logger.error(f"Error handling chat message: {e}", exc_info=True)
     
+    def on_chat_messages(self, messages: List[ChatMessage]) -> None:
+        """Handle a batch of chat messages with a single log line"""
+        try:
+            table = self.state.user_stats
+            chat_count = table.chat_count
+            for message in messages:
+                chat_count[table.touch(message.user_id, message.timestamp)] += 1
+            
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "[CHAT x%d] %s", len(messages),
+                    " | ".join(f"{m.username}({m.user_id}): {m.content}" for m in messages),
+                )
+        except Exception as e:
+            logger.error(f"Error handling chat messages: {e}", exc_info=True)
+    
+    def _record_gift(self, gift: GiftEvent) -> Optional[int]:
+        """Deduplicate and count a gift, returning the sender's stats row"""
+        event_key = hash(
+            (_TAG_GIFT, int(gift.timestamp * 1000), gift.user_id, gift.gift_name, gift.quantity)
+        )
+        if not self._dedup_int(event_key):
+            logger.debug("Duplicate gift event: %x", event_key)
+            return None
+        
+        return self.state.user_stats.record_gift(
+            gift.user_id, gift.quantity, gift.value_cny, gift.timestamp
+        )
+    
     def on_gift(self, gift: GiftEvent) -> None:
         """Handle gift event"""
         try:
-            # Deduplicate
-            event_id = f"gift:{gift.timestamp}:{gift.user_id}:{gift.gift_name}:{gift.quantity}"
-            if not self._dedup(event_id):
-                logger.debug(f"Duplicate gift event: {event_id}")
+            idx = self._record_gift(gift)
+            if idx is None:
                 return
             
-            # Update stats
-            stats = self._get_user_stats(gift.user_id)
-            stats.gift_count_today += gift.quantity
-            stats.gift_value_today += gift.value_in_cny
-            stats.last_seen_ts = time.time()
-            
             logger.info(
-                f"[GIFT] {gift.username}({gift.user_id}) sent {gift.quantity}x {gift.gift_name} "
-                f"(¥{gift.value_in_cny:.2f}) | today_total={stats.gift_count_today}"
+                "[GIFT] %s(%d) sent %dx %s (¥%.2f) | today_total=%d",
+                gift.username, gift.user_id, gift.quantity, gift.gift_name,
+                gift.value_cny, self.state.user_stats.gift_count[idx],
             )
         except Exception as e:
             logger.error(f"Error handling gift: {e}", exc_info=True)
     
+    def on_gifts(self, gifts: List[GiftEvent]) -> None:
+        """Handle a batch of gift events with a single log line"""
+        try:
+            counted = [gift for gift in gifts if self._record_gift(gift) is not None]
+            
+            if counted and logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "[GIFT x%d] ¥%.2f | %s", len(counted), sum(g.value_cny for g in counted),
+                    " | ".join(
+                        f"{g.username}({g.user_id}) {g.quantity}x {g.gift_name}" for g in counted
+                    ),
+                )
+        except Exception as e:
+            logger.error(f"Error handling gifts: {e}", exc_info=True)
+    
     def on_super_chat(self, sc: SuperChatEvent) -> None:
         """Handle super chat event"""
         try:
             # Deduplicate
-            event_id = f"sc:{sc.message_id}:{sc.user_id}"
-            if not self._dedup(event_id):
-                logger.debug(f"Duplicate SC event: {event_id}")
-                return
+            # message_id is unique per SC; fall back to a composite key without it
+            if sc.message_id:
+                if not self._dedup_int(sc.message_id):
+                    logger.debug("Duplicate SC event: %d", sc.message_id)
+                    return
+            else:
+                event_key = _pack_event_key(_TAG_SC, sc.user_id, int(sc.timestamp * 1000), 0)
+                if not self._dedup(event_key):
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Duplicate SC event: %s", event_key.hex())
+                    return
             
             # Update stats
-            stats = self._get_user_stats(sc.user_id)
-            stats.gift_value_today += sc.price_cny
-            stats.last_seen_ts = time.time()
+            table = self.state.user_stats
+            idx = table.touch(sc.user_id, sc.timestamp)
+            table.gift_value[idx] += sc.price_cny
             
             logger.info(
-                f"[SC] {sc.username}({sc.user_id}) ¥{sc.price_cny}: {sc.message} "
-                f"| today_value=¥{stats.gift_value_today:.2f}"
+                "[SC] %s(%d) ¥%s: %s | today_value=¥%.2f",
+                sc.username, sc.user_id, sc.price_cny, sc.message, table.gift_value[idx],
             )
         except Exception as e:
             logger.error(f"Error handling super chat: {e}", exc_info=True)
@@ -131,14 +300,20 @@ class LiveStreamBot(LiveStreamEventHandler):
         """Handle guard purchase event"""
         try:
             # Deduplicate
-            event_id = f"guard:{guard.timestamp}:{guard.user_id}:{guard.guard_level.value}"
-            if not self._dedup(event_id):
-                logger.debug(f"Duplicate guard event: {event_id}")
+            event_key = _pack_event_key(
+                _TAG_GUARD,
+                guard.user_id,
+                int(guard.timestamp * 1000),
+                guard.guard_level.value,
+            )
+            if not self._dedup(event_key):
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Duplicate guard event: %s", event_key.hex())
                 return
             
             logger.info(
-                f"[GUARD] {guard.username}({guard.user_id}) "
-                f"bought {guard.guard_level.name} x{guard.quantity}"
+                "[GUARD] %s(%d) bought %s x%d",
+                guard.username, guard.user_id, guard.guard_level.name, guard.quantity,
             )
         except Exception as e:
             logger.error(f"Error handling guard purchase: {e}", exc_info=True)
@@ -149,9 +324,10 @@ class LiveStreamBot(LiveStreamEventHandler):
     
     def get_stats_summary(self) -> Dict:
         """Get summary statistics"""
-        total_users = len(self.state.user_stats)
-        total_gifts = sum(s.gift_count_today for s in self.state.user_stats.values())
-        total_value = sum(s.gift_value_today for s in self.state.user_stats.values())
+        table = self.state.user_stats
+        total_users = len(table)
+        total_gifts = sum(table.gift_count)
+        total_value = sum(table.gift_value)
         
         return {
             "total_users": total_users,
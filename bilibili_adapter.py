@@ -3,9 +3,12 @@ Bilibili adapter implementation using blivedm library
 This is the ONLY file that knows about blivedm
 If blivedm breaks or gets replaced, only THIS file changes
 """
+import asyncio
+import inspect
 import logging
 import time
-from typing import List, Optional
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
 
 import blivedm
 from blivedm import (
@@ -29,6 +32,182 @@ from domain_models import (
 
 logger = logging.getLogger(__name__)
 
+# Handler methods the translation layer dispatches to -> event type
+_EVENT_METHODS = {
+    'on_chat_message': ChatMessage,
+    'on_gift': GiftEvent,
+    'on_super_chat': SuperChatEvent,
+    'on_guard_purchase': GuardPurchaseEvent,
+}
+# Optional batch variants, called once per drained batch with a list
+_BATCH_METHODS = {'on_chat_message': 'on_chat_messages', 'on_gift': 'on_gifts'}
+
+# Platform value -> enum, built once instead of Enum lookups per event
+_COIN_TYPES = {coin.value: coin for coin in CoinType}
+_GUARD_LEVELS = {level.value: level for level in GuardLevel}
+
+# Pending events between blivedm callbacks and handler dispatch
+_QUEUE_SIZE = 10_000
+# Events are coalesced for up to _BATCH_WINDOW seconds or _BATCH_SIZE events
+_BATCH_SIZE = 128
+_BATCH_WINDOW = 0.02
+
+
+class _EventPool:
+    """
+    Free list of domain event objects for one event type.
+    
+    Recycled objects are re-initialised in place, so the slotted domain
+    models keep their fixed shape. When disabled, release() is a no-op and
+    acquire() always builds a fresh object.
+    """
+    __slots__ = ('_cls', '_free', '_enabled')
+    
+    def __init__(self, cls: type, enabled: bool):
+        self._cls = cls
+        self._free: list = []
+        self._enabled = enabled
+    
+    def acquire(self, **fields):
+        """Get an initialised event, reusing a released one if available"""
+        if self._free:
+            obj = self._free.pop()
+            obj.__init__(**fields)
+            return obj
+        return self._cls(**fields)
+    
+    def release_all(self, objs: list) -> None:
+        """Return events once every handler is done with them"""
+        if self._enabled:
+            self._free.extend(objs)
+
+
+class _EventQueue:
+    """
+    Bounded queue of (route, event) items between blivedm and _drain().
+    
+    Chat and paid events (gifts, SCs, guards) are held in separate deques
+    so that a full queue drops chat first: the oldest queued chat goes,
+    or an incoming chat when none is queued. Paid events are only dropped
+    when the whole queue is paid. get_nowait() merges both deques back
+    into arrival order by sequence number.
+    """
+    __slots__ = ('_maxsize', '_chat', '_paid', '_seq', '_ready')
+    
+    def __init__(self, maxsize: int):
+        self._maxsize = maxsize
+        self._chat: deque = deque()
+        self._paid: deque = deque()
+        self._seq = 0
+        self._ready = asyncio.Event()
+    
+    def __len__(self) -> int:
+        return len(self._chat) + len(self._paid)
+    
+    def put(self, route: '_EventRoute', event) -> bool:
+        """Queue an event, returning False if an event had to be dropped"""
+        kept = True
+        if len(self._chat) + len(self._paid) >= self._maxsize:
+            kept = False
+            if self._chat:
+                self._chat.popleft()
+            elif not route.paid:
+                return False
+            else:
+                self._paid.popleft()
+        (self._paid if route.paid else self._chat).append((self._seq, route, event))
+        self._seq += 1
+        self._ready.set()
+        return kept
+    
+    def get_nowait(self) -> Tuple['_EventRoute', object]:
+        """Remove and return the oldest (route, event); the queue must not be empty"""
+        chat, paid = self._chat, self._paid
+        if chat and (not paid or chat[0][0] < paid[0][0]):
+            _, route, event = chat.popleft()
+        else:
+            _, route, event = paid.popleft()
+        return route, event
+    
+    async def wait(self) -> None:
+        """Wait until an event is queued or wake() is called"""
+        await self._ready.wait()
+        self._ready.clear()
+    
+    def wake(self) -> None:
+        self._ready.set()
+
+
+class _HandlerWorker:
+    """
+    Runs the calls for one handler that has async methods, on its own task.
+    
+    Calls are queued in dispatch order and run one at a time, so the
+    handler sees its events in order while a slow one only delays itself.
+    The task starts on the first call and exits once close() is processed.
+    """
+    __slots__ = ('_name', '_queue', '_task', '_dropped')
+    
+    def __init__(self, name: str):
+        self._name = name
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._dropped = 0
+    
+    def submit(self, callback: Callable, arg) -> None:
+        """Queue a call, dropping it if the handler is too far behind"""
+        if self._queue.qsize() >= _QUEUE_SIZE:
+            self._dropped += 1
+            if self._dropped == 1 or self._dropped % 1000 == 0:
+                logger.warning(f"{self._name} is falling behind, dropped {self._dropped} events so far")
+            return
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(self._queue))
+        self._queue.put_nowait((callback, arg))
+    
+    def close(self) -> Optional[asyncio.Task]:
+        """Finish the queued calls and stop; returns the task to await, if any"""
+        task, self._task = self._task, None
+        if task is not None:
+            self._queue.put_nowait(None)
+            # Calls submitted from now on go to a fresh task
+            self._queue = asyncio.Queue()
+        return task
+    
+    @staticmethod
+    async def _run(queue: asyncio.Queue) -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            callback, arg = item
+            try:
+                result = callback(arg)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Error in handler {getattr(callback, '__qualname__', repr(callback))}: {e}", exc_info=True)
+
+
+class _EventRoute:
+    """
+    Dispatch targets for one event kind, shared by adapter and translator.
+    
+    Callbacks are stored as (callback, worker) pairs. worker is None for
+    plain handlers, which are called inline; otherwise the call is handed
+    to that handler's _HandlerWorker. Events reaching a worker outlive the
+    dispatch, so a route with any worker doesn't recycle its events.
+    """
+    __slots__ = ('callbacks', 'batch_callbacks', 'deferred', 'pool', 'paid')
+    
+    def __init__(self, pool: _EventPool, paid: bool):
+        self.callbacks: List[Tuple[Callable, Optional[_HandlerWorker]]] = []
+        self.batch_callbacks: List[Tuple[Callable, Optional[_HandlerWorker]]] = []
+        self.deferred = False
+        self.pool = pool
+        # Paid events are kept over chat when the event queue is full
+        self.paid = paid
+
 
 class BilibiliAdapter(LiveStreamAdapter):
     """
@@ -38,16 +217,34 @@ class BilibiliAdapter(LiveStreamAdapter):
     If blivedm is replaced, only this class changes.
     """
     
-    def __init__(self, session_data: Optional[str] = None):
+    def __init__(self, session_data: Optional[str] = None, reuse_events: bool = False):
         """
         Initialize Bilibili adapter
         
         Args:
             session_data: Optional SESSDATA cookie for authentication
+            reuse_events: Recycle domain event objects after dispatch.
+                Only enable if no handler keeps a reference to an event
+                after its callback returns.
         """
         self._client: Optional[BLiveClient] = None
         self._session_data = session_data
-        self._handlers: List[LiveStreamEventHandler] = []
+        # Keyed by id() for O(1) membership; dicts keep registration order
+        self._handlers: Dict[int, LiveStreamEventHandler] = {}
+        # Handlers with async methods, keyed like _handlers
+        self._workers: Dict[int, _HandlerWorker] = {}
+        # Workers of removed handlers still finishing their queued calls
+        self._retiring: set = set()
+        # Bound methods per event kind, refreshed when handlers change
+        self._routes: Dict[str, _EventRoute] = {
+            name: _EventRoute(_EventPool(cls, reuse_events), paid=cls is not ChatMessage)
+            for name, cls in _EVENT_METHODS.items()
+        }
+        # Translated events wait here until _drain() hands them to handlers
+        self._queue = _EventQueue(_QUEUE_SIZE)
+        self._drain_task: Optional[asyncio.Task] = None
+        # Tells _drain() to return once the queue is empty
+        self._stopping = False
         self._internal_handler: Optional['_BilivedmHandler'] = None
         self._connected = False
     
@@ -64,7 +261,7 @@ class BilibiliAdapter(LiveStreamAdapter):
             self._client = BLiveClient(room_id_int)
         
         # Create internal handler that bridges blivedm to our interface
-        self._internal_handler = _BilivedmHandler(self._handlers)
+        self._internal_handler = _BilivedmHandler(self._routes, self._queue)
         self._client.add_handler(self._internal_handler)
         
         self._connected = True
@@ -79,22 +276,71 @@ class BilibiliAdapter(LiveStreamAdapter):
             logger.info("Disconnected from Bilibili")
     
     def add_handler(self, handler: LiveStreamEventHandler) -> None:
-        """Register an event handler"""
-        if handler not in self._handlers:
-            self._handlers.append(handler)
+        """
+        Register an event handler
+        
+        Raises:
+            TypeError: If the handler doesn't implement every event method
+        """
+        missing = [name for name in _EVENT_METHODS if not callable(getattr(handler, name, None))]
+        if missing:
+            raise TypeError(
+                f"{handler.__class__.__name__} is missing handler methods: {', '.join(missing)}"
+            )
+        
+        if id(handler) not in self._handlers:
+            self._handlers[id(handler)] = handler
+            self._rebuild_callbacks()
             logger.debug(f"Added handler: {handler.__class__.__name__}")
     
     def remove_handler(self, handler: LiveStreamEventHandler) -> None:
         """Remove an event handler"""
-        if handler in self._handlers:
-            self._handlers.remove(handler)
+        if self._handlers.pop(id(handler), None) is not None:
+            self._rebuild_callbacks()
             logger.debug(f"Removed handler: {handler.__class__.__name__}")
     
+    def _rebuild_callbacks(self) -> None:
+        """Refresh the per-event callback lists shared with _BilivedmHandler"""
+        # A handler with any async method runs all of its calls on one
+        # worker, so it still sees every kind of event in dispatch order
+        workers = {}
+        for key, handler in self._handlers.items():
+            methods = [getattr(handler, name, None) for name in (*_EVENT_METHODS, *_BATCH_METHODS.values())]
+            if any(inspect.iscoroutinefunction(method) for method in methods):
+                workers[key] = self._workers.pop(key, None) or _HandlerWorker(handler.__class__.__name__)
+        for worker in self._workers.values():
+            self._retire(worker)
+        self._workers = workers
+        
+        for name, route in self._routes.items():
+            batch_name = _BATCH_METHODS.get(name)
+            callbacks, batch_callbacks = [], []
+            for key, handler in self._handlers.items():
+                worker = workers.get(key)
+                batch = getattr(handler, batch_name, None) if batch_name else None
+                if callable(batch):
+                    batch_callbacks.append((batch, worker))
+                else:
+                    callbacks.append((getattr(handler, name), worker))
+            route.callbacks = callbacks
+            route.batch_callbacks = batch_callbacks
+            route.deferred = any(worker is not None for _, worker in callbacks + batch_callbacks)
+    
+    def _retire(self, worker: _HandlerWorker) -> None:
+        """Close a worker, keeping its task referenced until it finishes"""
+        task = worker.close()
+        if task is not None:
+            self._retiring.add(task)
+            task.add_done_callback(self._retiring.discard)
+    
     async def start(self) -> None:
         """Start receiving events"""
         if not self._client:
             raise RuntimeError("Not connected. Call connect() first.")
         
+        if self._drain_task is None or self._drain_task.done():
+            self._drain_task = asyncio.create_task(self._drain())
+            self._drain_task.add_done_callback(self._on_drain_done)
         self._client.start()
         logger.info("Started receiving events from Bilibili")
     
@@ -103,6 +349,86 @@ class BilibiliAdapter(LiveStreamAdapter):
         if self._client:
             self._client.stop()
             logger.info("Stopped receiving events from Bilibili")
+        
+        if self._drain_task is not None:
+            # Deliver everything already queued rather than dropping it
+            self._stopping = True
+            self._queue.wake()
+            # wait() rather than await: a crash was already logged by _on_drain_done
+            await asyncio.wait([self._drain_task])
+            self._drain_task = None
+            self._stopping = False
+        
+        for worker in self._workers.values():
+            self._retire(worker)
+        if self._retiring:
+            await asyncio.gather(*self._retiring)
+    
+    def _on_drain_done(self, task: asyncio.Task) -> None:
+        """Log a drain task that crashed instead of returning through stop()"""
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                "Event dispatch task crashed, events are no longer delivered",
+                exc_info=task.exception(),
+            )
+    
+    async def _drain(self) -> None:
+        """
+        Dispatch queued events to handlers in batches.
+        
+        Once an event arrives, waits up to _BATCH_WINDOW seconds for more
+        (unless _BATCH_SIZE are already queued), then dispatches them
+        together. Batch methods get one list per kind, first; per-event
+        methods then get each event in arrival order. Calls for
+        handlers with async methods are only queued on their workers, so
+        a slow handler never holds up this loop or blivedm's reader.
+        
+        After stop() sets _stopping, dispatches whatever is still queued
+        without waiting out the batch window, then returns.
+        """
+        queue = self._queue
+        while True:
+            if not queue:
+                if self._stopping:
+                    return
+                await queue.wait()
+                continue
+            if not self._stopping:
+                await asyncio.sleep(_BATCH_WINDOW if len(queue) < _BATCH_SIZE else 0)
+            
+            items = [queue.get_nowait() for _ in range(min(len(queue), _BATCH_SIZE))]
+            batch: Dict[_EventRoute, list] = {}
+            for route, event in items:
+                events = batch.get(route)
+                if events is None:
+                    batch[route] = [event]
+                else:
+                    events.append(event)
+            
+            # Guard each call so one failure only costs that call
+            for route, events in batch.items():
+                for callback, worker in route.batch_callbacks:
+                    if worker is not None:
+                        worker.submit(callback, events)
+                        continue
+                    try:
+                        callback(events)
+                    except Exception as e:
+                        logger.error(f"Error in handler {getattr(callback, '__qualname__', repr(callback))}: {e}", exc_info=True)
+            # Per-event methods get events in arrival order, across kinds
+            for route, event in items:
+                for callback, worker in route.callbacks:
+                    if worker is not None:
+                        worker.submit(callback, event)
+                        continue
+                    try:
+                        callback(event)
+                    except Exception as e:
+                        logger.error(f"Error in handler {getattr(callback, '__qualname__', repr(callback))}: {e}", exc_info=True)
+            
+            for route, events in batch.items():
+                if not route.deferred:
+                    route.pool.release_all(events)
     
     @property
     def is_connected(self) -> bool:
@@ -116,22 +442,21 @@ class _BilivedmHandler(BaseHandler):
     This is the "translation layer" between blivedm and our domain.
     """
     
-    def __init__(self, handlers: List[LiveStreamEventHandler]):
+    def __init__(self, routes: Dict[str, _EventRoute], queue: _EventQueue):
         super().__init__()
-        self._handlers = handlers
+        self._queue = queue
+        self._dropped = 0
+        self._chat = routes['on_chat_message']
+        self._gift = routes['on_gift']
+        self._sc = routes['on_super_chat']
+        self._guard = routes['on_guard_purchase']
     
-    def _notify_handlers(self, method_name: str, *args, **kwargs):
-        """Notify all registered handlers"""
-        for handler in self._handlers:
-            try:
-                method = getattr(handler, method_name, None)
-                if method:
-                    method(*args, **kwargs)
-            except Exception as e:
-                logger.error(
-                    f"Error in handler {handler.__class__.__name__}.{method_name}: {e}",
-                    exc_info=True
-                )
+    def _enqueue(self, route: _EventRoute, event) -> None:
+        """Queue an event for dispatch; a full queue drops chat first"""
+        if not self._queue.put(route, event):
+            self._dropped += 1
+            if self._dropped == 1 or self._dropped % 1000 == 0:
+                logger.warning(f"Event queue full, dropped {self._dropped} events so far")
     
     def _on_danmaku(self, client: BLiveClient, message: DanmakuMessage):
         """Translate blivedm danmaku to ChatMessage"""
@@ -142,19 +467,20 @@ class _BilivedmHandler(BaseHandler):
                 return
             
             # Translate to domain model
-            chat_msg = ChatMessage(
+            chat_msg = self._chat.pool.acquire(
                 user_id=int(message.uid),
                 username=str(message.uname),
                 content=str(message.msg),
-                timestamp=float(message.timestamp) if message.timestamp else time.time(),
+                # blivedm reports danmaku time in milliseconds
+                timestamp=message.timestamp / 1000.0 if message.timestamp else time.time(),
                 user_level=int(message.user_level) if message.user_level is not None else None,
                 medal_name=str(message.medal_name) if message.medal_name else None,
                 is_admin=bool(message.admin) if message.admin else False,
                 is_vip=bool(message.vip or message.svip) if (message.vip or message.svip) else False,
             )
             
-            # Notify application handlers
-            self._notify_handlers('on_chat_message', chat_msg)
+            # Queue for application handlers
+            self._enqueue(self._chat, chat_msg)
             
         except Exception as e:
             logger.error(f"Failed to process danmaku: {e}", exc_info=True)
@@ -167,24 +493,12 @@ class _BilivedmHandler(BaseHandler):
                 logger.warning("Gift missing required fields, skipping")
                 return
             
-            # Parse coin type
-            coin_type = CoinType.UNKNOWN
-            if message.coin_type:
-                try:
-                    coin_type = CoinType(str(message.coin_type).lower())
-                except ValueError:
-                    coin_type = CoinType.UNKNOWN
-            
-            # Parse guard level
-            guard_level = GuardLevel.NONE
-            if message.guard_level:
-                try:
-                    guard_level = GuardLevel(int(message.guard_level))
-                except ValueError:
-                    guard_level = GuardLevel.NONE
+            # Parse coin type and guard level
+            coin_type = _COIN_TYPES.get(message.coin_type, CoinType.UNKNOWN)
+            guard_level = _GUARD_LEVELS.get(message.guard_level, GuardLevel.NONE)
             
             # Translate to domain model
-            gift_event = GiftEvent(
+            gift_event = self._gift.pool.acquire(
                 user_id=int(message.uid),
                 username=str(message.uname),
                 gift_name=str(message.gift_name),
@@ -196,8 +510,8 @@ class _BilivedmHandler(BaseHandler):
                 guard_level=guard_level,
             )
             
-            # Notify application handlers
-            self._notify_handlers('on_gift', gift_event)
+            # Queue for application handlers
+            self._enqueue(self._gift, gift_event)
             
         except Exception as e:
             logger.error(f"Failed to process gift: {e}", exc_info=True)
@@ -211,7 +525,7 @@ class _BilivedmHandler(BaseHandler):
                 return
             
             # Translate to domain model
-            sc_event = SuperChatEvent(
+            sc_event = self._sc.pool.acquire(
                 user_id=int(message.uid),
                 username=str(message.uname),
                 message=str(message.message) if message.message else "",
@@ -221,8 +535,8 @@ class _BilivedmHandler(BaseHandler):
                 duration_seconds=int(message.time) if message.time else None,
             )
             
-            # Notify application handlers
-            self._notify_handlers('on_super_chat', sc_event)
+            # Queue for application handlers
+            self._enqueue(self._sc, sc_event)
             
         except Exception as e:
             logger.error(f"Failed to process super chat: {e}", exc_info=True)
@@ -236,15 +550,10 @@ class _BilivedmHandler(BaseHandler):
                 return
             
             # Parse guard level
-            guard_level = GuardLevel.NONE
-            if message.guard_level:
-                try:
-                    guard_level = GuardLevel(int(message.guard_level))
-                except ValueError:
-                    guard_level = GuardLevel.NONE
+            guard_level = _GUARD_LEVELS.get(message.guard_level, GuardLevel.NONE)
             
             # Translate to domain model
-            guard_event = GuardPurchaseEvent(
+            guard_event = self._guard.pool.acquire(
                 user_id=int(message.uid),
                 username=str(message.username),
                 guard_level=guard_level,
@@ -253,8 +562,8 @@ class _BilivedmHandler(BaseHandler):
                 timestamp=float(message.start_time) if message.start_time else time.time(),
             )
             
-            # Notify application handlers
-            self._notify_handlers('on_guard_purchase', guard_event)
+            # Queue for application handlers
+            self._enqueue(self._guard, guard_event)
             
         except Exception as e:
             logger.error(f"Failed to process guard purchase: {e}", exc_info=True)
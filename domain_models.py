@@ -2,7 +2,7 @@
 Core domain models - Independent of any external library
 These represent YOUR application's understanding of live stream events
 """
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 from enum import Enum
 
@@ -22,7 +22,7 @@ class GuardLevel(Enum):
     CAPTAIN = 3   # 舰长
 
 
-@dataclass
+@dataclass(slots=True)
 class ChatMessage:
     """
     Domain model for a chat message (弹幕)
@@ -40,7 +40,7 @@ class ChatMessage:
     is_vip: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class GiftEvent:
     """
     Domain model for a gift event
@@ -57,15 +57,22 @@ class GiftEvent:
     unit_price: Optional[int] = None
     guard_level: GuardLevel = GuardLevel.NONE
     
+    # Derived: value in Chinese Yuan, computed once at construction
+    value_cny: float = field(init=False)
+    
+    def __post_init__(self):
+        if self.coin_type is CoinType.GOLD:
+            self.value_cny = self.total_value / 1000.0
+        else:
+            self.value_cny = 0.0
+    
     @property
     def value_in_cny(self) -> float:
-        """Calculate value in Chinese Yuan"""
-        if self.coin_type == CoinType.GOLD:
-            return self.total_value / 1000.0
-        return 0.0
+        """Value in Chinese Yuan (alias of value_cny)"""
+        return self.value_cny
 
 
-@dataclass
+@dataclass(slots=True)
 class SuperChatEvent:
     """
     Domain model for Super Chat (醒目留言)
@@ -81,7 +88,7 @@ class SuperChatEvent:
     duration_seconds: Optional[int] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class GuardPurchaseEvent:
     """
     Domain model for guard/captain subscription
@@ -3,7 +3,7 @@ Abstract interface for live stream platforms
 This defines what ANY live stream adapter must provide
 """
 from abc import ABC, abstractmethod
-from typing import Protocol, Callable
+from typing import Awaitable, Protocol, Callable, Union
 from domain_models import ChatMessage, GiftEvent, SuperChatEvent, GuardPurchaseEvent
 
 
@@ -11,25 +11,42 @@ class LiveStreamEventHandler(Protocol):
     """
     Protocol defining what events handlers should implement
     Your application code implements this, not the adapter
+    
+    Handlers should catch their own exceptions. One that escapes is logged
+    by the adapter and only loses that call: the failing event (or batch,
+    for batch methods) for that handler. Other events and other handlers
+    are still dispatched.
+    
+    Handlers may also define on_chat_messages(List[ChatMessage]) and
+    on_gifts(List[GiftEvent]). Adapters that batch events call those once
+    per batch instead of on_chat_message/on_gift for each event, ahead of
+    the per-event calls for the same batch, so a batch method's events
+    are only in order within their own kind.
+    
+    Methods may be plain functions or coroutines (async def). Plain
+    methods are called directly, which is cheapest for CPU-only handlers.
+    A handler with any async method gets its own task: its calls run one
+    at a time in dispatch order, so it sees events in order, and a slow
+    handler delays only itself. There is no ordering between handlers.
     """
     
-    def on_chat_message(self, message: ChatMessage) -> None:
+    def on_chat_message(self, message: ChatMessage) -> Union[None, Awaitable[None]]:
         """Called when a chat message is received"""
         ...
     
-    def on_gift(self, gift: GiftEvent) -> None:
+    def on_gift(self, gift: GiftEvent) -> Union[None, Awaitable[None]]:
         """Called when a gift is received"""
         ...
     
-    def on_super_chat(self, sc: SuperChatEvent) -> None:
+    def on_super_chat(self, sc: SuperChatEvent) -> Union[None, Awaitable[None]]:
         """Called when a super chat is received"""
         ...
     
-    def on_guard_purchase(self, guard: GuardPurchaseEvent) -> None:
+    def on_guard_purchase(self, guard: GuardPurchaseEvent) -> Union[None, Awaitable[None]]:
         """Called when someone purchases guard/captain"""
         ...
     
-    def on_connection_error(self, error: Exception) -> None:
+    def on_connection_error(self, error: Exception) -> Union[None, Awaitable[None]]:
         """Called when connection fails"""
         ...
 
@@ -64,6 +81,9 @@ class LiveStreamAdapter(ABC):
         
         Args:
             handler: Object implementing LiveStreamEventHandler protocol
+        
+        Raises:
+            TypeError: If the handler doesn't implement the event methods
         """
         pass
     